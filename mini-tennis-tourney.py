@@ -1,179 +1,276 @@
+from __future__ import annotations
+
 import streamlit as st
 import random
-import math
-from reportlab.lib.pagesizes import letter, landscape
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer
-from reportlab.lib.styles import getSampleStyleSheet
+import os
+import sys
+from collections import namedtuple
+from dataclasses import dataclass
+from itertools import cycle
+from reportlab.lib.pagesizes import letter
 from reportlab.lib.units import inch
 from io import BytesIO
 
+# --- Tournament Constants ---
+MAX_TEAMS = 16
+# Team names and match ids are interned since they are used as dict keys and compared on every rerun
+TEAM_NAMES = tuple(sys.intern(f"Team {i+1}") for i in range(MAX_TEAMS)) # Formatted once; rounds slice what they need
+BYE_TEAM = sys.intern('BYE')
+
+# --- Data Structures ---
+@dataclass(slots=True)
+class Match:
+    """One bracket slot: its two teams (team2 is BYE_TEAM for byes) and the winner once decided."""
+    team1: str | None = None
+    team2: str | None = None
+    winner: str | None = None
+
+# Interned kind tags for round items and view rows, compared with `is` in the per-row dispatch
+MATCH_ITEM = sys.intern('match')
+BYE_ITEM = sys.intern('bye')
+
+# A round's display entry: kind is MATCH_ITEM or BYE_ITEM (team2 is BYE_TEAM for byes), court is set by assign_courts
+RoundItem = namedtuple('RoundItem', 'kind match_id team1 team2 court', defaults=(None,))
+
+def make_match_item(match_id: str, team1: str, team2: str) -> RoundItem:
+    """Creates the display item for a match; both teams must be known."""
+    assert match_id and team1 and team2, f"Incomplete match item: {match_id}, {team1}, {team2}"
+    return RoundItem(MATCH_ITEM, match_id, team1, team2)
+
+def make_bye_item(match_id: str, team: str) -> RoundItem:
+    """Creates the display item for a team that gets a bye."""
+    assert match_id and team, f"Incomplete bye item: {match_id}, {team}"
+    return RoundItem(BYE_ITEM, match_id, team, BYE_TEAM)
+
+# --- PDF Constants ---
+PDF_REQUIRED_KEYS = ('teams', 'num_rounds', 'rounds_match_ids', 'match_details', 'tournament_finished', 'final_winner')
+PDF_PAGE_SETTINGS = {'pagesize': letter, 'rightMargin': 72, 'leftMargin': 72, 'topMargin': 72, 'bottomMargin': 18}
+
 # --- Helper Functions ---
-def get_bracket_size(num_teams):
+def get_bracket_size(num_teams: int) -> int:
     """Finds the smallest power of 2 >= num_teams."""
     if num_teams < 1:
         return 1
-    return 2**math.ceil(math.log2(num_teams))
+    return 1 << (num_teams - 1).bit_length() # Integer-only: no float log2 rounding at exact powers of two
 
-def get_num_rounds(bracket_size):
+def get_num_rounds(bracket_size: int) -> int:
     """Calculates the number of rounds for a given bracket size."""
     if bracket_size < 2:
         return 0
-    return int(math.log2(bracket_size))
-
-def initialize_bracket_structure_with_courts(num_teams, num_courts):
-    """Creates the initial tournament structure and assigns courts for Round 1."""
+    return bracket_size.bit_length() - 1
+
+def assign_courts(items: list[RoundItem], num_courts: int) -> list[RoundItem]:
+    """Returns the display items with courts 1..num_courts assigned in round-robin order."""
+    return [item._replace(court=court) for item, court in zip(items, cycle(range(1, num_courts + 1)))]
+
+def build_round_view(items: list[RoundItem]) -> list[tuple]:
+    """Pre-formats a round's display items once, so reruns only emit elements.
+
+    Each row is (kind, match_id, court_heading, text, radio_label, options). Items come from
+    the make_*_item factories, so no per-row validation is needed here.
+    """
+    rows = []
+    for i, item in enumerate(items):
+        court = item.court
+        court_heading = f"**Court {court}**"
+
+        if item.kind is BYE_ITEM:
+            team = item.team1
+            rows.append((BYE_ITEM, item.match_id, court_heading, f"Match {i+1}: **{team}** gets a BYE", None, (team,)))
+        else:
+            team1, team2 = item.team1, item.team2
+            rows.append((MATCH_ITEM, item.match_id, court_heading, f"Match {i+1}: **{team1}** vs **{team2}**",
+                         f"Winner for Match {i+1} on Court {court}:", (team1, team2)))
+
+    return rows
+
+def set_current_round_items(items: list[RoundItem]) -> None:
+    """Stores a round's display items along with the view rows and match count derived from them."""
+    st.session_state.current_round_items = items
+    st.session_state.current_round_view = build_round_view(items)
+    st.session_state.num_actual_matches_in_round = sum(1 for row in st.session_state.current_round_view if row[0] is MATCH_ITEM)
+
+@st.cache_resource(show_spinner=False)
+def build_bracket_topology(num_teams: int) -> dict:
+    """Builds the team-independent bracket structure for `num_teams`.
+
+    Returns the bracket size, round count, bye count, per-round match ids (index 0 unused),
+    the feeder pair of every later-round match and the final's match id. The result is shared
+    by every session without copying, so callers must treat it as read-only.
+    """
     bracket_size = get_bracket_size(num_teams)
     num_rounds = get_num_rounds(bracket_size)
     byes = bracket_size - num_teams
 
-    teams = [f"Team {i+1}" for i in range(num_teams)]
-    random.shuffle(teams)
+    # R1 holds the played matches first, then one bye entry per team that skips the round
+    r1_match_ids = [sys.intern(f'R1_M{i}') for i in range((num_teams - byes) // 2)]
+    r1_bye_ids = [sys.intern(f'R1_B{i}') for i in range(byes)]
+    rounds_match_ids = [(), (*r1_match_ids, *r1_bye_ids)]
 
+    # Later rounds: each match is fed by a consecutive pair of the previous round's matches
+    # (zip drops a trailing unpaired match)
+    next_round_feed = {}
+    for round_index in range(2, num_rounds + 1):
+        prev_round_match_ids = rounds_match_ids[-1]
+        round_feed = {sys.intern(f'R{round_index}_M{i}'): (feed1_id, feed2_id)
+                      for i, (feed1_id, feed2_id) in enumerate(zip(prev_round_match_ids[0::2], prev_round_match_ids[1::2]))}
+        next_round_feed |= round_feed
+        rounds_match_ids.append(tuple(round_feed))
+
+    # Identify the final match_id
+    if num_rounds >= 1 and len(rounds_match_ids[num_rounds]) == 1:
+         final_match_id = rounds_match_ids[num_rounds][0]
+    else:
+         final_match_id = None
+
+    return {
+        'bracket_size': bracket_size,
+        'num_rounds': num_rounds,
+        'byes': byes,
+        'rounds_match_ids': tuple(rounds_match_ids),
+        'next_round_feed': next_round_feed,
+        'final_match_id': final_match_id,
+    }
+
+def initialize_bracket_structure_with_courts(num_teams: int, num_courts: int, seed: int) -> None:
+    """Creates the initial tournament structure and assigns courts for Round 1.
+
+    The bracket topology is cached per team count; only the seeded draw and court numbers are
+    computed here. All shuffling goes through a Random seeded with `seed`, so the same seed
+    reproduces the same draw.
+    """
+    rng = random.Random(seed)
+    topology = build_bracket_topology(num_teams)
+    byes = topology['byes']
+    rounds_match_ids = topology['rounds_match_ids']
+
+    teams = rng.sample(TEAM_NAMES[:num_teams], num_teams)
+
+    st.session_state.seed = seed
     st.session_state.teams = teams
-    st.session_state.bracket_size = bracket_size
-    st.session_state.num_rounds = num_rounds
+    st.session_state.bracket_size = topology['bracket_size']
+    st.session_state.num_rounds = topology['num_rounds']
     st.session_state.byes = byes
     st.session_state.num_courts = num_courts
-    st.session_state.match_details = {}
-    st.session_state.rounds_match_ids = [[] for _ in range(num_rounds + 1)]
-    st.session_state.next_round_feed = {}
 
     # Create R1 matches and bye entries
-    r1_match_ids = []
-    r1_items_for_display = []
-
-    teams_copy = list(teams)
-    teams_with_byes = teams_copy[:byes]
-    teams_playing_r1 = teams_copy[byes:]
-
-    for i in range(0, len(teams_playing_r1), 2):
-        team1 = teams_playing_r1[i]
-        team2 = teams_playing_r1[i+1]
-        match_id = f'R1_M{i//2}'
-        st.session_state.match_details[match_id] = {'teams': [team1, team2], 'winner': None}
-        r1_match_ids.append(match_id)
-        r1_items_for_display.append({'type': 'match', 'match_id': match_id, 'teams': [team1, team2]})
-
-    bye_items_for_display = []
-    for i, team in enumerate(teams_with_byes):
-        bye_match_id = f'R1_B{i}'
-        # Note: Bye items use 'team' (singular) key in the display item structure
-        st.session_state.match_details[bye_match_id] = {'teams': [team, 'BYE'], 'winner': team} # Still store as ['Team', 'BYE'] in match_details for consistency
-        r1_match_ids.append(bye_match_id)
-        bye_items_for_display.append({'type': 'bye', 'match_id': bye_match_id, 'team': team}) # Store as 'team' in display items
-
-    st.session_state.rounds_match_ids[1] = r1_match_ids
-
-    all_r1_display_items = r1_items_for_display + bye_items_for_display
-    random.shuffle(all_r1_display_items)
+    teams_with_byes = teams[:byes] # Slices are already copies
+    teams_playing_r1 = teams[byes:]
+    num_r1_matches = len(teams_playing_r1) // 2
+    r1_match_ids = rounds_match_ids[1][:num_r1_matches]
+    r1_bye_ids = rounds_match_ids[1][num_r1_matches:]
+
+    # Pair neighbouring teams: (0, 1), (2, 3), ...
+    r1_pairs = zip(teams_playing_r1[0::2], teams_playing_r1[1::2])
+    r1_matches = {match_id: Match(team1, team2) for match_id, (team1, team2) in zip(r1_match_ids, r1_pairs)}
+    # Still store BYE_TEAM as team2 in match_details for consistency
+    r1_byes = {match_id: Match(team, BYE_TEAM, team) for match_id, team in zip(r1_bye_ids, teams_with_byes)}
+    later_matches = {match_id: Match() for match_id in topology['next_round_feed']}
+
+    # Matches then byes in one list, so the seeded shuffle sees the same order as before
+    all_r1_display_items = [make_match_item(match_id, match.team1, match.team2) for match_id, match in r1_matches.items()]
+    all_r1_display_items.extend(make_bye_item(match_id, match.team1) for match_id, match in r1_byes.items())
+    rng.shuffle(all_r1_display_items)
 
     # Assign courts to R1 display items
-    for i, item in enumerate(all_r1_display_items):
-        item['court'] = (i % num_courts) + 1
+    all_r1_display_items = assign_courts(all_r1_display_items, num_courts)
 
-    st.session_state.current_round_items = all_r1_display_items
+    set_current_round_items(all_r1_display_items)
     st.session_state.current_round_index = 1
     st.session_state.tournament_started = True
     st.session_state.tournament_finished = False
     st.session_state.final_winner = None
     st.session_state.round_winners_in_progress = {}
 
-    prev_round_match_ids = r1_match_ids
-    for round_index in range(2, num_rounds + 1):
-        current_round_match_ids = []
-        for i in range(0, len(prev_round_match_ids), 2):
-            if i + 1 < len(prev_round_match_ids):
-                match_id = f'R{round_index}_M{i//2}'
-                st.session_state.match_details[match_id] = {'teams': [None, None], 'winner': None}
-                st.session_state.next_round_feed[match_id] = [prev_round_match_ids[i], prev_round_match_ids[i+1]]
-                current_round_match_ids.append(match_id)
+    st.session_state.match_details = r1_matches | r1_byes | later_matches
+    st.session_state.next_round_feed = topology['next_round_feed']
+    st.session_state.rounds_match_ids = rounds_match_ids
+    st.session_state.final_match_id = topology['final_match_id']
 
-        st.session_state.rounds_match_ids[round_index] = current_round_match_ids
-        prev_round_match_ids = current_round_match_ids
 
-    # Identify the final match_id
-    if num_rounds >= 1 and len(st.session_state.rounds_match_ids[num_rounds]) == 1:
-         st.session_state.final_match_id = st.session_state.rounds_match_ids[num_rounds][0]
-    else:
-         st.session_state.final_match_id = None
+def render_bye_row(match_id, text, radio_label, options, round_winners_in_progress):
+    """Shows a bye; the team advances automatically."""
+    st.write(text)
+    return options[0]
+
+def render_match_row(match_id, text, radio_label, options, round_winners_in_progress):
+    """Shows a match with a radio for its winner and returns the current selection."""
+    st.write(text) # Display teams after court and match number
+
+    selected_winner = round_winners_in_progress.get(match_id)
 
+    winner_selection = st.radio(
+        radio_label, # Includes the court for clarity
+        options,
+        key=f"winner_{match_id}",
+        index=0 if selected_winner == options[0] else (1 if selected_winner == options[1] else None)
+    )
+
+    if winner_selection and winner_selection != selected_winner: # Only write back when the selection changed
+        round_winners_in_progress[match_id] = winner_selection
+    return winner_selection
+
+# Row kind -> renderer, looked up once per row instead of an if/elif chain
+ROW_RENDERERS = {MATCH_ITEM: render_match_row, BYE_ITEM: render_bye_row}
 
 def display_current_round():
-    """Displays the matches for the current round and collects winner selections."""
+    """Displays the matches for the current round in a form and collects winner selections.
+
+    Returns the selected winners, whether every match has one, and whether the form was submitted.
+    """
     st.header(f"Round {st.session_state.current_round_index}")
     st.write("Select the winner for each match.")
 
     current_round_winners = {}
     all_winners_selected = True
-
-    # Iterate through the items prepared for the current round display
-    for i, item in enumerate(st.session_state.current_round_items):
-        # Use .get() with default values for robustness
-        item_type = item.get('type')
-        match_id = item.get('match_id')
-        court = item.get('court') # Use .get() here
-
-        # Basic check for essential keys
-        if item_type is None or match_id is None:
-             st.warning(f"Skipping invalid item {i+1} due to missing type or match_id: {item}")
-             all_winners_selected = False # Cannot advance if data is missing
-             continue # Skip to the next item
-
-        # Display court assignment explicitly and prominently first
-        if court is not None:
-            st.subheader(f"**Court {court}**") # Using subheader to make it stand out
-
-        # Display match number and details based on item type
-        if item_type == 'bye':
-            team = item.get('team') # Get team name using 'team' key for bye items
-            if team:
-                 st.write(f"Match {i+1}: **{team}** gets a BYE")
-                 current_round_winners[match_id] = team
+    # Bind the in-progress selections once rather than going through session state per match
+    round_winners_in_progress = st.session_state.round_winners_in_progress # Always present via SESSION_DEFAULTS
+    # Bind the per-row Streamlit calls once outside the loop
+    write, subheader = st.write, st.subheader
+
+    # Batch the round's selections in a form so the script only reruns on submit
+    with st.form(f"round_{st.session_state.current_round_index}_form"):
+        # Iterate through the rows pre-formatted when the round was set up
+        for kind, match_id, court_heading, text, radio_label, options in st.session_state.current_round_view:
+            # Display court assignment explicitly and prominently first
+            subheader(court_heading) # Using subheader to make it stand out
+
+            # Render the row with its kind's handler; it returns the winner, or None if undecided
+            winner = ROW_RENDERERS[kind](match_id, text, radio_label, options, round_winners_in_progress)
+            if winner:
+                current_round_winners[match_id] = winner
             else:
-                 st.warning(f"Skipping bye item {i+1} due to missing team name: {item}")
-                 all_winners_selected = False
-
-        elif item_type == 'match':
-            teams = item.get('teams') # Get teams list using 'teams' key for match items
-            if teams is not None and isinstance(teams, list) and len(teams) >= 2:
-                team1 = teams[0]
-                team2 = teams[1]
-
-                st.write(f"Match {i+1}: **{team1}** vs **{team2}**") # Display teams after court and match number
-
-                selected_winner = st.session_state.get('round_winners_in_progress', {}).get(match_id)
-
-                winner_selection = st.radio(
-                    f"Winner for Match {i+1} on Court {court}:", # Include court in radio button label for clarity
-                    [team1, team2],
-                    key=f"winner_{match_id}",
-                    index=[team1, team2].index(selected_winner) if selected_winner in [team1, team2] else None
-                )
-
-                if winner_selection:
-                    current_round_winners[match_id] = winner_selection
-                    if 'round_winners_in_progress' not in st.session_state:
-                        st.session_state.round_winners_in_progress = {}
-                    st.session_state.round_winners_in_progress[match_id] = winner_selection
-                else:
-                    all_winners_selected = False
-            else:
-                 st.warning(f"Match {i+1} is missing required teams or teams data is invalid: {item}")
-                 all_winners_selected = False # Cannot advance if teams are missing
-        else:
-            st.warning(f"Skipping item {i+1} with unknown type '{item_type}': {item}")
-            all_winners_selected = False
+                all_winners_selected = False # Cannot advance without a winner for every match
 
-        st.write("---") # Add a separator for clarity between matches
+            write("---") # Add a separator for clarity between matches
+        submitted = st.form_submit_button("Advance to Next Round")
 
+    return current_round_winners, all_winners_selected, submitted
 
-    return current_round_winners, all_winners_selected
+@st.fragment
+def play_current_round():
+    """Runs the current round's form as a fragment so incomplete submits only rerun the round.
 
-def advance_to_next_round_structured(current_round_winners):
+    The full app reruns once per round, when every winner is selected and the round advances.
+    """
+    current_round_winners, all_winners_selected, submitted = display_current_round()
+
+    # num_actual_matches_in_round is counted once from the rows when the round is set up
+    if submitted and st.session_state.num_actual_matches_in_round > 0:
+        if all_winners_selected:
+            advance_to_next_round_structured(current_round_winners)
+            st.rerun(scope="app")
+        else:
+            st.info("Please select winners for all matches to advance.")
+
+def advance_to_next_round_structured(current_round_winners: dict[str, str]) -> None:
     """Processes the current round's winners and sets up the next round."""
+    match_details = st.session_state.match_details
+    next_round_feed = st.session_state.next_round_feed
+
     for match_id, winner in current_round_winners.items():
-        if match_id in st.session_state.match_details:
-            st.session_state.match_details[match_id]['winner'] = winner
+        if match_id in match_details:
+            match_details[match_id].winner = winner
 
     st.session_state.round_winners_in_progress = {}
     st.session_state.current_round_index += 1
@@ -181,8 +278,9 @@ def advance_to_next_round_structured(current_round_winners):
 
     if next_round_index > st.session_state.num_rounds:
         st.session_state.tournament_finished = True
-        if st.session_state.final_match_id and st.session_state.final_match_id in st.session_state.match_details:
-             st.session_state.final_winner = st.session_state.match_details[st.session_state.final_match_id]['winner']
+        final_match_id = st.session_state.final_match_id
+        if final_match_id and final_match_id in match_details:
+             st.session_state.final_winner = match_details[final_match_id].winner
         else:
              st.session_state.final_winner = "Undetermined"
         st.balloons()
@@ -192,138 +290,181 @@ def advance_to_next_round_structured(current_round_winners):
     next_round_items_for_display = []
 
     for match_id in next_round_match_ids:
-        if match_id in st.session_state.next_round_feed:
-            feed1_id, feed2_id = st.session_state.next_round_feed[match_id]
+        if match_id in next_round_feed:
+            feed1_id, feed2_id = next_round_feed[match_id]
 
-            team1 = st.session_state.match_details.get(feed1_id, {}).get('winner')
-            team2 = st.session_state.match_details.get(feed2_id, {}).get('winner')
+            # Feeder matches are always from the round just played, so read their winners directly
+            team1 = current_round_winners.get(feed1_id)
+            team2 = current_round_winners.get(feed2_id)
 
-            st.session_state.match_details[match_id]['teams'] = [team1, team2]
+            next_match = match_details[match_id]
+            next_match.team1, next_match.team2 = team1, team2
 
             # Create the display item for the next round match
-            next_round_items_for_display.append({
-                'type': 'match',
-                'match_id': match_id,
-                'teams': [team1, team2],
-                'winner': None
-            })
+            next_round_items_for_display.append(make_match_item(match_id, team1, team2))
         else:
             st.error(f"Error setting up match {match_id}: Feed information missing.")
 
     # Assign courts to the matches in the next round items for display
-    # Only assign courts if there are items to display and num_courts is valid
-    if next_round_items_for_display and st.session_state.num_courts > 0:
-        for i, item in enumerate(next_round_items_for_display):
-            item['court'] = (i % st.session_state.num_courts) + 1
-
+    # (the setup widget guarantees at least two courts, and an empty round is a no-op)
+    next_round_items_for_display = assign_courts(next_round_items_for_display, st.session_state.num_courts)
 
-    st.session_state.current_round_items = next_round_items_for_display
+    set_current_round_items(next_round_items_for_display)
     st.session_state.tournament_finished = False
 
-def create_tournament_pdf_structured():
-    """Generates a PDF summary of the tournament results."""
-    required_keys = ['teams', 'num_rounds', 'rounds_match_ids', 'match_details', 'tournament_finished', 'final_winner']
-    if not all(key in st.session_state for key in required_keys):
-        st.error("Tournament data is incomplete or missing. Cannot generate PDF.")
-        return None
-
-    if not isinstance(st.session_state.rounds_match_ids, list):
-        st.error("Tournament rounds data is corrupted. Cannot generate PDF.")
-        return None
+@st.cache_resource
+def get_pdf_stylesheet():
+    """Builds the ReportLab sample stylesheet once per process."""
+    from reportlab.lib.styles import getSampleStyleSheet
+    return getSampleStyleSheet()
+
+def format_match_result(match_id: str, match_teams: tuple[str, str] | None, winner: str | None) -> str:
+    """Formats one match's line in the results PDF."""
+    if match_teams is None:
+        return f"Details missing for match {match_id}."
+    team1, team2 = match_teams
+    if team2 == BYE_TEAM:
+        return f"{team1} gets a BYE"
+    return f"{team1} vs {team2} - Winner: {winner}" if winner else f"{team1} vs {team2}"
+
+@st.cache_data(ttl=24*60*60, show_spinner=False)
+def build_tournament_pdf(teams: tuple[str, ...], rounds: tuple | None, champion: str | None) -> bytes:
+    """Builds the results PDF from a hashable snapshot of the tournament and returns its bytes.
+
+    `rounds` is None when the round data is unusable, otherwise one entry per round:
+    None for a corrupted round, or a tuple of (match_id, teams, winner) where teams is
+    None if the match details are missing.
+    """
+    # Platypus is slow to import, so it is only loaded once a PDF is actually requested
+    from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer
 
     buffer = BytesIO()
-    doc = SimpleDocTemplate(buffer, pagesize=letter, rightMargin=72, leftMargin=72, topMargin=72, bottomMargin=18)
+    doc = SimpleDocTemplate(buffer, **PDF_PAGE_SETTINGS)
     elements = []
-    styles = getSampleStyleSheet()
+    append = elements.append
+    styles = get_pdf_stylesheet()
+    h1, h2, normal = styles['h1'], styles['h2'], styles['Normal'] # Resolve the styles once per build
+    section_spacer = Spacer(1, 0.2 * inch) # Spacers hold no layout state, so one instance serves every gap
 
-    elements.append(Paragraph("Tennis Tournament Results", styles['h1']))
-    elements.append(Spacer(1, 0.2 * inch))
+    append(Paragraph("Tennis Tournament Results", h1))
+    append(section_spacer)
 
-    elements.append(Paragraph("Initial Teams:", styles['h2']))
-    initial_teams_text = ", ".join(st.session_state.teams)
-    elements.append(Paragraph(initial_teams_text, styles['Normal']))
-    elements.append(Spacer(1, 0.2 * inch))
+    append(Paragraph("Initial Teams:", h2))
+    initial_teams_text = ", ".join(teams)
+    append(Paragraph(initial_teams_text, normal))
+    append(section_spacer)
 
-    if isinstance(st.session_state.num_rounds, int) and st.session_state.num_rounds >= 1:
-        for r_index in range(1, st.session_state.num_rounds + 1):
-             elements.append(Paragraph(f"Round {r_index} Results:", styles['h2']))
+    if rounds is not None:
+        for r_index, round_results in enumerate(rounds, start=1):
+             append(Paragraph(f"Round {r_index} Results:", h2))
 
-             if r_index >= len(st.session_state.rounds_match_ids) or not isinstance(st.session_state.rounds_match_ids[r_index], list):
-                 st.warning(f"Data for Round {r_index} is missing or corrupted.")
-                 elements.append(Paragraph(f"Data for Round {r_index} is missing or corrupted.", styles['Normal']))
+             if round_results is None:
+                 append(Paragraph(f"Data for Round {r_index} is missing or corrupted.", normal))
                  continue
 
-             round_match_ids = st.session_state.rounds_match_ids[r_index]
-
-             if not round_match_ids:
-                  elements.append(Paragraph("No matches in this round.", styles['Normal']))
+             if not round_results:
+                  append(Paragraph("No matches in this round.", normal))
                   continue
 
-             for match_id in round_match_ids:
-                 match_details = st.session_state.match_details.get(match_id)
-                 if match_details:
-                     team1, team2 = match_details.get('teams', [None, None])
-                     winner = match_details.get('winner')
-                     if team2 == 'BYE':
-                         elements.append(Paragraph(f"{team1} gets a BYE", styles['Normal']))
-                     else:
-                         result_text = f"{team1} vs {team2}"
-                         if winner:
-                             result_text += f" - Winner: {winner}"
-                         elements.append(Paragraph(result_text, styles['Normal']))
-                 else:
-                      elements.append(Paragraph(f"Details missing for match {match_id}.", styles['Normal']))
-             elements.append(Spacer(1, 0.2 * inch))
+             # Format the round's lines in one pass and lay them out as one paragraph
+             result_lines = [format_match_result(match_id, match_teams, winner) for match_id, match_teams, winner in round_results]
+             append(Paragraph("<br/>".join(result_lines), normal))
+             append(section_spacer)
     else:
-        elements.append(Paragraph("Tournament rounds data is incomplete.", styles['Normal']))
+        append(Paragraph("Tournament rounds data is incomplete.", normal))
 
-    if st.session_state.tournament_finished and st.session_state.final_winner:
-         elements.append(Paragraph("Tournament Champion:", styles['h2']))
-         elements.append(Paragraph(st.session_state.final_winner, styles['Normal']))
+    if champion:
+         append(Paragraph("Tournament Champion:", h2))
+         append(Paragraph(champion, normal))
 
     doc.build(elements)
-    buffer.seek(0)
-    return buffer
+    return buffer.getvalue()
+
+def create_tournament_pdf_structured() -> bytes | None:
+    """Generates a PDF summary of the tournament results as bytes."""
+    if not all(key in st.session_state for key in PDF_REQUIRED_KEYS):
+        st.error("Tournament data is incomplete or missing. Cannot generate PDF.")
+        return None
+
+    if not isinstance(st.session_state.rounds_match_ids, tuple):
+        st.error("Tournament rounds data is corrupted. Cannot generate PDF.")
+        return None
+
+    # Snapshot the session state into hashable tuples so the ReportLab build is cached
+    rounds_match_ids = st.session_state.rounds_match_ids
+    match_details = st.session_state.match_details
+    num_rounds = st.session_state.num_rounds
+    rounds = None
+    if isinstance(num_rounds, int) and num_rounds >= 1:
+        rounds = []
+        for r_index in range(1, num_rounds + 1):
+             if r_index >= len(rounds_match_ids) or not isinstance(rounds_match_ids[r_index], tuple):
+                 st.warning(f"Data for Round {r_index} is missing or corrupted.")
+                 rounds.append(None)
+                 continue
+
+             # One dict probe per match; a missing match is kept as a (match_id, None, None) row
+             round_matches = ((match_id, match_details.get(match_id)) for match_id in rounds_match_ids[r_index])
+             rounds.append(tuple((match_id, (match.team1, match.team2), match.winner) if match else (match_id, None, None)
+                                 for match_id, match in round_matches))
+        rounds = tuple(rounds)
+
+    champion = st.session_state.final_winner if st.session_state.tournament_finished else None
+    return build_tournament_pdf(tuple(st.session_state.teams), rounds, champion)
 
 
 # --- Streamlit App Layout ---
 st.title("Tennis Tournament Simulator")
 
-# Initialize session state using a single flag
+# Defaults for every session state key the app reads
+SESSION_DEFAULTS = {
+    'initialized': True,
+    'tournament_started': False,
+    'tournament_finished': False,
+    'final_winner': None,
+    'round_winners_in_progress': {},
+    'teams': [],
+    'bracket_size': 0,
+    'num_rounds': 0,
+    'byes': 0,
+    'num_courts': 0,
+    'match_details': {},
+    'rounds_match_ids': (),
+    'next_round_feed': {},
+    'current_round_items': [],
+    'current_round_view': [],
+    'num_actual_matches_in_round': 0,
+    'current_round_index': 0,
+    'final_match_id': None,
+    'pdf_ready': False,
+    'seed': None,
+}
+
+# Initialize session state using a single flag, writing all defaults in one batch
 if 'initialized' not in st.session_state:
-    st.session_state.initialized = True
-    st.session_state.tournament_started = False
-    st.session_state.tournament_finished = False
-    st.session_state.final_winner = None
-    st.session_state.round_winners_in_progress = {}
-    st.session_state.teams = []
-    st.session_state.bracket_size = 0
-    st.session_state.num_rounds = 0
-    st.session_state.byes = 0
-    st.session_state.num_courts = 0
-    st.session_state.match_details = {}
-    st.session_state.rounds_match_ids = []
-    st.session_state.next_round_feed = {}
-    st.session_state.current_round_items = []
-    st.session_state.current_round_index = 0
-    st.session_state.final_match_id = None
+    st.session_state.update(SESSION_DEFAULTS)
 
 
 # Input section (only shown before the tournament starts)
 if not st.session_state.tournament_started:
     st.sidebar.header("Tournament Setup")
-    num_teams = st.sidebar.number_input("Number of teams (8-16):", min_value=8, max_value=16, value=8, step=1)
+    num_teams = st.sidebar.number_input("Number of teams (8-16):", min_value=8, max_value=MAX_TEAMS, value=8, step=1)
     num_courts = st.sidebar.number_input("Number of courts (2-4):", min_value=2, max_value=4, value=2, step=1)
+    draw_seed = st.sidebar.number_input("Draw seed (optional):", min_value=0, value=None, step=1, help="Reuse a seed to reproduce a previous draw.")
 
     if st.sidebar.button("Start Tournament"):
-        initialize_bracket_structure_with_courts(num_teams, num_courts)
+        # Fresh seeds come straight from the OS; the draw itself only uses the Random built from the seed
+        seed = draw_seed if draw_seed is not None else int.from_bytes(os.urandom(4), 'big')
+        initialize_bracket_structure_with_courts(num_teams, num_courts, seed)
         st.rerun()
 else:
     # Display current setup when tournament has started
     st.sidebar.header("Current Tournament Setup")
-    st.sidebar.write(f"Teams: {len(st.session_state.teams)}")
-    st.sidebar.write(f"Courts: {st.session_state.num_courts}")
-    st.sidebar.write(f"Current Round: {st.session_state.current_round_index}")
+    # One markdown element with hard line breaks instead of a write per line
+    st.sidebar.markdown(f"Teams: {len(st.session_state.teams)}  \n"
+                        f"Courts: {st.session_state.num_courts}  \n"
+                        f"Current Round: {st.session_state.current_round_index}  \n"
+                        f"Draw seed: {st.session_state.seed}")
 
     # --- Display Initial Court Assignments Summary (after tournament starts, before round display) ---
     if st.session_state.tournament_started and st.session_state.current_round_index == 1 and not st.session_state.round_winners_in_progress:
@@ -331,33 +472,24 @@ else:
         st.write("Here is the court assignment summary for the first round:")
         st.write("---") # Separator before the list
 
-        # Group items by court number
-        court_assignments_summary = {}
+        # Group items by court number, pre-seeded in court order so no sort is needed
+        court_assignments_summary = {court: [] for court in range(1, st.session_state.num_courts + 1)}
         for item in st.session_state.current_round_items:
-            court = item.get('court')
-            if court is not None:
-                if court not in court_assignments_summary:
-                    court_assignments_summary[court] = []
-
-                item_type = item.get('type')
-                if item_type == 'bye':
-                    team = item.get('team')
-                    if team:
-                        court_assignments_summary[court].append(f"{team} (BYE)")
-                elif item_type == 'match':
-                    teams = item.get('teams')
-                    if teams is not None and isinstance(teams, list) and len(teams) >= 2:
-                        court_assignments_summary[court].extend(teams) # Add both teams to the list
-
-        # Display the summary by court number
+            if item.court in court_assignments_summary:
+                if item.kind is BYE_ITEM:
+                    court_assignments_summary[item.court].append(f"{item.team1} (BYE)")
+                elif item.kind is MATCH_ITEM:
+                    court_assignments_summary[item.court].extend((item.team1, item.team2)) # Add both teams to the list
+
+        # Display the summary by court number as a single markdown element
         if court_assignments_summary:
-            # Sort courts numerically for cleaner display
-            for court_num in sorted(court_assignments_summary.keys()):
-                teams_on_court = court_assignments_summary[court_num]
+            summary_lines = []
+            for court_num, teams_on_court in court_assignments_summary.items():
                 if teams_on_court:
-                    st.write(f"**Court {court_num}:** {', '.join(teams_on_court)}")
+                    summary_lines.append(f"**Court {court_num}:** {', '.join(teams_on_court)}")
                 else:
-                     st.write(f"**Court {court_num}:** No assignments") # Should not happen with current logic
+                     summary_lines.append(f"**Court {court_num}:** No assignments") # Should not happen with current logic
+            st.markdown("\n\n".join(summary_lines))
 
         st.write("---") # Separator after the summary
         st.write("Scroll down to select winners for Round 1.") # Guide the user
@@ -367,18 +499,7 @@ else:
 if st.session_state.tournament_started and not st.session_state.tournament_finished:
     # Display the interactive round details below the initial summary
     if st.session_state.current_round_index >= 1: # Always show interactive round details once tournament starts
-         current_round_winners, all_winners_selected = display_current_round()
-
-         # Recalculate num_actual_matches_in_round based on the items successfully processed
-         num_actual_matches_in_round = sum(1 for item in st.session_state.current_round_items if item.get('type') == 'match' and item.get('teams') is not None and isinstance(item.get('teams'), list) and len(item.get('teams')) >= 2)
-
-
-         if all_winners_selected and num_actual_matches_in_round > 0:
-             if st.button("Advance to Next Round"):
-                 advance_to_next_round_structured(current_round_winners)
-                 st.rerun()
-         elif num_actual_matches_in_round > 0 and not all_winners_selected:
-             st.info("Please select winners for all matches to advance.")
+         play_current_round()
 
 
 # Tournament finished
@@ -391,23 +512,28 @@ elif st.session_state.tournament_finished:
 
     st.write("---")
     st.subheader("Download Tournament Results")
-    pdf_buffer = create_tournament_pdf_structured()
-    if pdf_buffer:
-        st.download_button(
-            label="Download PDF Results",
-            data=pdf_buffer,
-            file_name="tournament_results.pdf",
-            mime="application/pdf"
-        )
+    # Only build the PDF once the user asks for it
+    if not st.session_state.pdf_ready:
+        if st.button("Prepare PDF"):
+            st.session_state.pdf_ready = True
+            st.rerun()
     else:
-        st.warning("Could not generate PDF due to missing tournament data.")
+        pdf_bytes = create_tournament_pdf_structured()
+        if pdf_bytes:
+            st.download_button(
+                label="Download PDF Results",
+                data=pdf_bytes,
+                file_name="tournament_results.pdf",
+                mime="application/pdf"
+            )
+        else:
+            st.warning("Could not generate PDF due to missing tournament data.")
 
 
 # --- Reset Button ---
 if st.session_state.tournament_started or st.session_state.tournament_finished:
     st.sidebar.write("---")
     if st.sidebar.button("Reset Tournament"):
-        for key in list(st.session_state.keys()):
-            del st.session_state[key]
+        st.session_state.clear()
         st.rerun()
 